@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+VPN SOCKS5 Proxy Benchmark
+==========================
+
+Self-contained load test for the proxy. Starts VPNSocks5Proxy in a child
+process, pointed at a local stub DNS server, and drives traffic through it
+to a local echo/sink server, so results do not depend on the VPN or the
+internet. Reports connection rate, tunnel throughput, setup latency
+percentiles and the proxy's peak memory and thread count as JSON that can
+be compared across runs.
+
+Examples:
+    python examples/benchmark.py
+    python examples/benchmark.py --engine asyncio --concurrency 200 --duration 20
+    python examples/benchmark.py --idle-tunnels 10000 --output before.json
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import struct
+import sys
+import threading
+import time
+
+# Make socks5_proxy importable when run from the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from socks5_proxy import VPNSocks5Proxy, ENGINES  # noqa: E402
+
+
+class StubDNSProtocol(asyncio.DatagramProtocol):
+    """Answers every A query with 127.0.0.1 and every other query with no records."""
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.queries = 0
+
+    def datagram_received(self, data, addr):
+        self.queries += 1
+        qid = data[:2]
+        offset = 12
+        while data[offset]:
+            offset += data[offset] + 1
+        question = data[12:offset + 5]
+        qtype = struct.unpack('>H', data[offset + 1:offset + 3])[0]
+        if qtype == 1:
+            answer = b'\xc0\x0c' + struct.pack('>HHIH', 1, 1, 300, 4) + socket.inet_aton('127.0.0.1')
+            header = qid + struct.pack('>HHHHH', 0x8180, 1, 1, 0, 0)
+        else:
+            answer = b''
+            header = qid + struct.pack('>HHHHH', 0x8180, 1, 0, 0, 0)
+        self.transport.sendto(header + question + answer, addr)
+
+
+class TargetServer:
+    """Echo server that can also act as a sink, counting bytes received."""
+
+    def __init__(self):
+        self.bytes_received = 0
+        self.writers = set()
+
+    async def handle(self, reader, writer):
+        """Echo until the first byte says 'S' (sink), then discard everything."""
+        self.writers.add(writer)
+        try:
+            first = await reader.read(65536)
+            sink = first.startswith(b'S')
+            if not sink and first:
+                writer.write(first)
+            self.bytes_received += len(first)
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                self.bytes_received += len(data)
+                if not sink:
+                    writer.write(data)
+                    await writer.drain()
+        except Exception:
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    def close_all(self):
+        """Close every connection still open at shutdown."""
+        for writer in list(self.writers):
+            writer.close()
+
+
+def run_proxy(port, dns_port, engine, buffer_size, max_connections):
+    """Child process entry point: run the proxy against the stub DNS server."""
+    sys.stdout = open(os.devnull, 'w')  # Keep the banner and stats out of the JSON
+    # No snapshot or network cache: every run starts cold and leaves the
+    # user's real files alone
+    proxy = VPNSocks5Proxy(host='127.0.0.1', port=port, vpn_dns=['127.0.0.1'],
+                           engine=engine, buffer_size=buffer_size, log_level='ERROR',
+                           max_connections=max_connections,
+                           dns_snapshot=None, network_cache=None)
+    proxy.dns_client.port = dns_port
+    try:
+        proxy.start()
+    except KeyboardInterrupt:
+        pass
+
+
+class ProcessSampler:
+    """Samples a process's RSS and thread count (Linux /proc, else psutil if installed)."""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss_kb = None
+        self.peak_threads = None
+        self.running = True
+        self._psutil = None
+        try:
+            import psutil
+            self._psutil = psutil.Process(pid)
+        except Exception:
+            pass
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def sample(self):
+        """Return (rss_kb, threads) now, or (None, None) if unavailable."""
+        try:
+            with open(f'/proc/{self.pid}/status') as f:
+                fields = dict(line.split(':', 1) for line in f if ':' in line)
+            return int(fields['VmRSS'].split()[0]), int(fields['Threads'])
+        except Exception:
+            pass
+        if self._psutil is not None:
+            try:
+                return self._psutil.memory_info().rss // 1024, self._psutil.num_threads()
+            except Exception:
+                pass
+        return None, None
+
+    def _run(self):
+        while self.running:
+            rss, threads = self.sample()
+            if rss is not None:
+                self.peak_rss_kb = max(self.peak_rss_kb or 0, rss)
+                self.peak_threads = max(self.peak_threads or 0, threads)
+            time.sleep(self.interval)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def open_tunnel(proxy_port, atyp, target_port, name):
+    """Open a tunnel through the proxy; returns (reader, writer, setup seconds)."""
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', proxy_port)
+    if atyp == 'ipv4':
+        address = b'\x01' + socket.inet_aton('127.0.0.1')
+    else:
+        encoded = name.encode()
+        address = b'\x03' + bytes([len(encoded)]) + encoded
+    # Greeting and request are sent separately, as most clients do
+    writer.write(b'\x05\x01\x00')
+    if await reader.readexactly(2) != b'\x05\x00':
+        raise ConnectionError('Handshake rejected')
+    writer.write(b'\x05\x01\x00' + address + struct.pack('>H', target_port))
+    reply = await reader.readexactly(4)
+    if reply[1] != 0x00:
+        writer.close()
+        raise ConnectionError(f'CONNECT failed with code {reply[1]}')
+    await reader.readexactly(6 if reply[3] == 0x01 else 18)
+    return reader, writer, time.perf_counter() - started
+
+
+async def connect_phase(args, target_port):
+    """Open, use and close tunnels as fast as possible for args.duration seconds."""
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + args.duration
+    counter = [0]
+    atyps = ['ipv4', 'domain'] if args.atyp == 'both' else [args.atyp]
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            counter[0] += 1
+            atyp = atyps[counter[0] % len(atyps)]
+            name = f'host{counter[0] % args.names}.bench.test'
+            try:
+                reader, writer, setup = await open_tunnel(args.port, atyp, target_port, name)
+                writer.write(b'E' * 64)
+                await reader.readexactly(64)
+                writer.close()
+                latencies.append(setup)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'connections': len(latencies),
+        'errors': errors,
+        'connections_per_sec': round(len(latencies) / elapsed, 1),
+        'setup_latency_ms': {
+            name: round(percentile(latencies, q) * 1000, 3) if latencies else None
+            for name, q in (('p50', 0.5), ('p99', 0.99), ('p999', 0.999))
+        },
+    }
+
+
+async def throughput_phase(args, target_port, target):
+    """Stream data through args.tunnels tunnels into the sink for args.duration seconds."""
+    chunk = b'S' * 65536
+    deadline = time.perf_counter() + args.duration
+    before = target.bytes_received
+
+    async def stream():
+        reader, writer, _ = await open_tunnel(args.port, 'ipv4', target_port, '')
+        while time.perf_counter() < deadline:
+            writer.write(chunk)
+            await writer.drain()
+        writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(stream() for _ in range(args.tunnels)), return_exceptions=True)
+    await asyncio.sleep(0.5)  # Let in-flight data reach the sink
+    elapsed = time.perf_counter() - started
+    received = target.bytes_received - before
+    return {
+        'tunnels': args.tunnels,
+        'bytes': received,
+        'mb_per_sec': round(received / elapsed / 1e6, 1),
+    }
+
+
+async def idle_phase(args, target_port, sampler):
+    """Hold args.idle_tunnels idle tunnels open and sample the proxy's footprint."""
+    baseline_rss, _ = sampler.sample()
+    tunnels = []
+    errors = 0
+    for start in range(0, args.idle_tunnels, 500):
+        batch = await asyncio.gather(
+            *(open_tunnel(args.port, 'ipv4', target_port, '')
+              for _ in range(min(500, args.idle_tunnels - start))),
+            return_exceptions=True)
+        for result in batch:
+            if isinstance(result, Exception):
+                errors += 1
+            else:
+                tunnels.append(result[1])
+    await asyncio.sleep(1.0)
+    rss, threads = sampler.sample()
+    for writer in tunnels:
+        writer.close()
+    return {
+        'requested': args.idle_tunnels,
+        'open': len(tunnels),
+        'errors': errors,
+        'rss_kb': rss,
+        'rss_kb_per_tunnel': (round((rss - baseline_rss) / len(tunnels), 2)
+                              if rss and baseline_rss and tunnels else None),
+        'threads': threads,
+    }
+
+
+async def run_benchmark(args):
+    """Start the local servers and the proxy, run each phase and collect results."""
+    loop = asyncio.get_event_loop()
+    target = TargetServer()
+    server = await asyncio.start_server(target.handle, '127.0.0.1', 0, backlog=4096)
+    target_port = server.sockets[0].getsockname()[1]
+    dns_transport, dns = await loop.create_datagram_endpoint(
+        StubDNSProtocol, local_addr=('127.0.0.1', 0))
+    dns_port = dns_transport.get_extra_info('sockname')[1]
+
+    # Room for every idle tunnel plus the active load, so none is refused as busy
+    max_connections = max(1024, args.idle_tunnels + args.concurrency + 64)
+    proxy = multiprocessing.Process(target=run_proxy, daemon=True,
+                                    args=(args.port, dns_port, args.engine, args.buffer_size,
+                                          max_connections))
+    proxy.start()
+    sampler = ProcessSampler(proxy.pid)
+    try:
+        for _ in range(50):  # Wait for the proxy to listen
+            try:
+                _, writer = await asyncio.open_connection('127.0.0.1', args.port)
+                writer.close()
+                break
+            except OSError:
+                await asyncio.sleep(0.1)
+
+        results = {
+            'config': {
+                'engine': args.engine,
+                'concurrency': args.concurrency,
+                'duration': args.duration,
+                'atyp': args.atyp,
+                'names': args.names,
+                'buffer_size': args.buffer_size,
+            },
+            'system': {
+                'python': platform.python_version(),
+                'platform': sys.platform,
+                'cpus': os.cpu_count(),
+            },
+        }
+        if args.duration > 0:
+            results['connect'] = await connect_phase(args, target_port)
+            if args.tunnels > 0:
+                results['throughput'] = await throughput_phase(args, target_port, target)
+        if args.idle_tunnels > 0:
+            results['idle'] = await idle_phase(args, target_port, sampler)
+        results['dns_queries'] = dns.queries
+        results['proxy'] = {
+            'peak_rss_kb': sampler.peak_rss_kb,
+            'peak_threads': sampler.peak_threads,
+        }
+        return results
+    finally:
+        sampler.running = False
+        proxy.terminate()
+        proxy.join(5)
+        server.close()
+        target.close_all()
+        dns_transport.close()
+        await asyncio.sleep(0.1)
+
+
+def raise_fd_limit():
+    """Allow enough sockets for high concurrency and idle tunnel tests."""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard == resource.RLIM_INFINITY:
+            hard = 65536
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except Exception:
+        pass
+
+
+def main():
+    """Main benchmark function."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the VPN SOCKS5 Proxy locally')
+    parser.add_argument('--engine', choices=ENGINES, default='threaded',
+                        help='Proxy engine to benchmark (default: threaded)')
+    parser.add_argument('--port', type=int, default=19081, help='Proxy port to use (default: 19081)')
+    parser.add_argument('--concurrency', type=int, default=50,
+                        help='Concurrent clients in the connect phase (default: 50)')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='Seconds per connect/throughput phase; 0 skips them (default: 10)')
+    parser.add_argument('--atyp', choices=['ipv4', 'domain', 'both'], default='both',
+                        help='SOCKS5 address type for the connect phase (default: both)')
+    parser.add_argument('--names', type=int, default=100,
+                        help='Distinct domain names to cycle through (default: 100)')
+    parser.add_argument('--tunnels', type=int, default=4,
+                        help='Parallel tunnels in the throughput phase; 0 skips it (default: 4)')
+    parser.add_argument('--idle-tunnels', type=int, default=0,
+                        help='Idle tunnels to hold open to measure footprint (default: 0)')
+    parser.add_argument('--buffer-size', type=int, default=65536,
+                        help='Proxy relay buffer size in bytes (default: 65536)')
+    parser.add_argument('--output', help='Write JSON results to this file (default: stdout)')
+
+    args = parser.parse_args()
+    raise_fd_limit()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        results = loop.run_until_complete(run_benchmark(args))
+    finally:
+        loop.close()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,28 @@
 #!/bin/bash
 # VPN SOCKS5 Proxy Server - Linux/Mac Startup Script
+#
+# Usage: start_proxy.sh [options]   start the proxy (options are passed to socks5_proxy.py)
+#        start_proxy.sh reload      restart the running proxy without dropping connections
+
+# Change to script directory
+cd "$(dirname "$0")/.."
+
+# The serving process keeps its PID here, also across reloads
+PID_FILE="socks5_proxy.pid"
+
+if [ "$1" = "reload" ]; then
+    if ! { read -r pid mode < "$PID_FILE"; } 2>/dev/null || ! kill -0 "$pid" 2>/dev/null; then
+        echo "No running proxy found ($PID_FILE)."
+        exit 1
+    fi
+    if [ "$mode" = "workers" ]; then
+        echo "The proxy runs with --workers, which cannot reload; restart it instead."
+        exit 1
+    fi
+    kill -HUP "$pid"
+    echo "Reload requested; open tunnels finish on the old process."
+    exit 0
+fi
 
 echo "========================================"
 echo "VPN SOCKS5 Proxy Server"
@@ -18,11 +41,8 @@ echo "Press Ctrl+C to stop the proxy"
 echo "========================================"
 echo ""
 
-# Change to script directory
-cd "$(dirname "$0")/.."
-
 # Start the proxy
-python3 socks5_proxy.py
+python3 socks5_proxy.py --pid-file "$PID_FILE" "$@"
 
 echo ""
 echo "Proxy stopped."
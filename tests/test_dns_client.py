@@ -0,0 +1,183 @@
+"""
+Tests for the built-in DNS client against stub DNS servers on loopback.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socks5_proxy import (DNS_RCODE_NXDOMAIN, DNS_TYPE_A, DNS_TYPE_AAAA,  # noqa: E402
+                          DNSClient, DNSError)
+
+SERVFAIL = 2
+
+
+class StubDNSServer:
+    """
+    Answers queries on a loopback port from a table keyed by query type.
+
+    answers maps a query type to (rcode, addresses); types missing from
+    the table are never answered. UDP answers for the types in truncate
+    are sent truncated; the same port then answers over TCP, or accepts
+    and never replies if tcp_answers is False.
+    """
+
+    def __init__(self, answers: dict, truncate=(), tcp_answers: bool = True,
+                 host: str = '127.0.0.1', port: int = 0):
+        self.answers = answers
+        self.truncate = truncate
+        self.tcp_answers = tcp_answers
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.port = self.sock.getsockname()[1]
+        self.listener = socket.socket()
+        self.listener.bind((host, self.port))
+        self.listener.listen()
+        self.connections = []
+        threading.Thread(target=self._serve, daemon=True).start()
+        threading.Thread(target=self._serve_tcp, daemon=True).start()
+
+    def close(self):
+        self.sock.close()
+        self.listener.close()
+        for conn in self.connections:
+            conn.close()
+
+    def _serve(self):
+        while True:
+            try:
+                query, client = self.sock.recvfrom(512)
+            except OSError:
+                return
+            reply = self.reply(query, truncated=True)
+            if reply is not None:
+                self.sock.sendto(reply, client)
+
+    def _serve_tcp(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections.append(conn)
+            if not self.tcp_answers:
+                continue  # Hold the connection open without answering
+            with conn:
+                data = b''
+                while len(data) < 2 or len(data) < 2 + struct.unpack('>H', data[:2])[0]:
+                    data += conn.recv(512)
+                reply = self.reply(data[2:])
+                conn.sendall(struct.pack('>H', len(reply)) + reply)
+
+    def reply(self, query: bytes, truncated: bool = False):
+        end = query.index(b'\x00', 12) + 5
+        question = query[12:end]
+        qtype = struct.unpack('>H', question[-4:-2])[0]
+        if qtype not in self.answers:
+            return None
+        rcode, addresses = self.answers[qtype]
+        flags = 0x8180 | rcode
+        if truncated and qtype in self.truncate:
+            flags |= 0x0200
+            addresses = []
+        family = socket.AF_INET if qtype == DNS_TYPE_A else socket.AF_INET6
+        records = b''
+        for address in addresses:
+            rdata = socket.inet_pton(family, address)
+            records += struct.pack('>HHHIH', 0xC00C, qtype, 1, 60, len(rdata)) + rdata
+        header = struct.pack('>HHHHHH', struct.unpack('>H', query[:2])[0], flags,
+                             1, len(addresses), 0, 0)
+        return header + question + records
+
+
+class RaceTests(unittest.TestCase):
+
+    def resolve(self, answers: dict, timeout: float = 1.0):
+        server = StubDNSServer(answers)
+        self.addCleanup(server.close)
+        client = DNSClient(timeout=timeout, retransmit=timeout, port=server.port)
+        return client.race('intranet.corp', ['127.0.0.1'])
+
+    def test_a_and_aaaa_are_combined(self):
+        server, records = self.resolve({DNS_TYPE_A: (0, ['10.1.2.3']),
+                                        DNS_TYPE_AAAA: (0, ['2001:db8::1'])})
+        self.assertEqual(server, '127.0.0.1')
+        self.assertEqual(sorted(r.address for r in records), ['10.1.2.3', '2001:db8::1'])
+
+    def test_aaaa_servfail_keeps_a_records(self):
+        # VPN resolvers commonly SERVFAIL AAAA queries for internal zones
+        _, records = self.resolve({DNS_TYPE_A: (0, ['10.1.2.3']),
+                                   DNS_TYPE_AAAA: (SERVFAIL, [])})
+        self.assertEqual([r.address for r in records], ['10.1.2.3'])
+
+    def test_aaaa_nxdomain_keeps_a_records(self):
+        _, records = self.resolve({DNS_TYPE_A: (0, ['10.1.2.3']),
+                                   DNS_TYPE_AAAA: (DNS_RCODE_NXDOMAIN, [])})
+        self.assertEqual([r.address for r in records], ['10.1.2.3'])
+
+    def test_unanswered_aaaa_keeps_a_records(self):
+        _, records = self.resolve({DNS_TYPE_A: (0, ['10.1.2.3'])}, timeout=0.3)
+        self.assertEqual([r.address for r in records], ['10.1.2.3'])
+
+    def test_nxdomain_needs_every_query_type(self):
+        with self.assertRaises(DNSError) as raised:
+            self.resolve({DNS_TYPE_A: (DNS_RCODE_NXDOMAIN, []),
+                          DNS_TYPE_AAAA: (DNS_RCODE_NXDOMAIN, [])})
+        self.assertEqual(raised.exception.rcode, DNS_RCODE_NXDOMAIN)
+
+        with self.assertRaises(DNSError) as raised:
+            self.resolve({DNS_TYPE_A: (DNS_RCODE_NXDOMAIN, []),
+                          DNS_TYPE_AAAA: (SERVFAIL, [])})
+        self.assertEqual(raised.exception.rcode, SERVFAIL)
+
+    def test_servfail_for_both_fails(self):
+        with self.assertRaises(DNSError) as raised:
+            self.resolve({DNS_TYPE_A: (SERVFAIL, []), DNS_TYPE_AAAA: (SERVFAIL, [])})
+        self.assertEqual(raised.exception.rcode, SERVFAIL)
+
+
+class TruncationTests(unittest.TestCase):
+
+    def test_truncated_answer_is_retried_over_tcp(self):
+        server = StubDNSServer({DNS_TYPE_A: (0, ['10.1.2.3', '10.1.2.4']),
+                                DNS_TYPE_AAAA: (0, [])}, truncate=(DNS_TYPE_A,))
+        self.addCleanup(server.close)
+        client = DNSClient(timeout=1.0, port=server.port)
+        _, records = client.race('intranet.corp', ['127.0.0.1'])
+        self.assertEqual(sorted(r.address for r in records), ['10.1.2.3', '10.1.2.4'])
+
+    def test_slow_tcp_retry_does_not_hold_up_the_race(self):
+        # 127.0.0.1 truncates and then never answers over TCP; 127.0.0.2
+        # (same port, started after the stagger) answers over UDP
+        try:
+            probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            probe.bind(('127.0.0.2', 0))
+            probe.close()
+        except OSError:
+            self.skipTest("127.0.0.2 is not a loopback address here")
+        slow = StubDNSServer({DNS_TYPE_A: (0, ['10.0.0.1']), DNS_TYPE_AAAA: (0, [])},
+                             truncate=(DNS_TYPE_A,), tcp_answers=False)
+        self.addCleanup(slow.close)
+        fast = StubDNSServer({DNS_TYPE_A: (0, ['10.0.0.2']), DNS_TYPE_AAAA: (0, [])},
+                             host='127.0.0.2', port=slow.port)
+        self.addCleanup(fast.close)
+
+        client = DNSClient(timeout=3.0, port=slow.port)
+        started = time.monotonic()
+        server, records = client.race('intranet.corp', ['127.0.0.1', '127.0.0.2'],
+                                      stagger=0.1)
+        self.assertEqual((server, [r.address for r in records]), ('127.0.0.2', ['10.0.0.2']))
+        self.assertLess(time.monotonic() - started, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
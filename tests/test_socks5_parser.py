@@ -0,0 +1,216 @@
+"""
+Property and fuzz tests for the incremental SOCKS5 handshake parser.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+
+import os
+import random
+import socket
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socks5_proxy import SOCKS5Error, SOCKS5Parser  # noqa: E402
+
+
+def greeting(methods: bytes = b'\x00') -> bytes:
+    return bytes([0x05, len(methods)]) + methods
+
+
+def request(atyp: int, address: str, port: int, command: int = 0x01) -> bytes:
+    if atyp == 0x01:
+        encoded = socket.inet_aton(address)
+    elif atyp == 0x03:
+        name = address.encode('utf-8')
+        encoded = bytes([len(name)]) + name
+    else:
+        encoded = socket.inet_pton(socket.AF_INET6, address)
+    return bytes([0x05, command, 0x00, atyp]) + encoded + struct.pack('>H', port)
+
+
+def split(data: bytes, rng: random.Random) -> list:
+    """Cut data at random boundaries (empty chunks and single bytes included)."""
+    cuts = sorted(rng.randint(0, len(data)) for _ in range(rng.randint(0, len(data))))
+    return [data[a:b] for a, b in zip([0] + cuts, cuts + [len(data)])]
+
+
+def drive(chunks: list) -> tuple:
+    """
+    Feed chunks the way the handlers do and parse greeting and request.
+
+    Returns:
+        (methods, command, atyp, address, port, pending bytes), or None if
+        the input ended before the request was complete
+    """
+    parser = SOCKS5Parser()
+    chunks = list(chunks)
+    for parse in (parser.parse_greeting, parser.parse_request):
+        while not parse():
+            if not chunks:
+                return None
+            parser.feed(chunks.pop(0))
+    pending = parser.take_pending() + b''.join(chunks)
+    return (parser.methods, parser.command, parser.atyp, parser.address, parser.port,
+            pending)
+
+
+# Valid handshakes covering every address type and edge lengths
+CASES = [
+    (greeting(), request(0x01, '10.19.1.23', 443)),
+    (greeting(b'\x02\x00\x01'), request(0x01, '0.0.0.0', 0, command=0x03)),
+    (greeting(bytes(range(255))), request(0x03, 'intranet.example.com', 8080)),
+    (greeting(), request(0x03, 'a', 1)),
+    (greeting(), request(0x03, 'x' * 255, 65535)),
+    (greeting(), request(0x03, 'bücher.example', 80)),
+    (greeting(), request(0x04, '2001:db8::1', 22)),
+    (greeting(), request(0x04, '::ffff:192.168.1.151', 1081)),
+]
+
+
+class SplitAndMergeTests(unittest.TestCase):
+    """The parse result must not depend on how the bytes were read."""
+
+    def test_random_boundaries(self):
+        rng = random.Random(1928)
+        for hello, req in CASES:
+            expected = drive([hello + req])
+            self.assertIsNotNone(expected)
+            for _ in range(200):
+                self.assertEqual(drive(split(hello + req, rng)), expected)
+
+    def test_byte_at_a_time(self):
+        for hello, req in CASES:
+            data = hello + req
+            self.assertEqual(drive([data[i:i + 1] for i in range(len(data))]),
+                             drive([data]))
+
+    def test_truncated_input_waits_for_more(self):
+        for hello, req in CASES:
+            data = hello + req
+            for length in range(len(data)):
+                self.assertIsNone(drive([data[:length]]))
+
+    def test_split_reads_from_socket(self):
+        rng = random.Random(1081)
+        hello, req = CASES[2]
+        client, server = socket.socketpair()
+        with client, server:
+            parser = SOCKS5Parser()
+            for chunk in split(hello + req, rng):
+                if chunk:
+                    client.sendall(chunk)
+            client.shutdown(socket.SHUT_WR)
+            while not parser.parse_greeting():
+                self.assertTrue(parser.recv_from(server))
+            while not parser.parse_request():
+                self.assertTrue(parser.recv_from(server))
+            self.assertEqual(parser.address, 'intranet.example.com')
+            self.assertEqual(parser.port, 8080)
+            self.assertEqual(parser.take_pending(), b'')
+
+
+class PipeliningTests(unittest.TestCase):
+    """Bytes sent after the request are kept, in order, for the destination."""
+
+    def test_greeting_request_and_payload_in_one_read(self):
+        payload = b'\x16\x03\x01\x02\x00' + bytes(range(256)) * 4  # TLS-like ClientHello
+        hello, req = CASES[0]
+        result = drive([hello + req + payload])
+        self.assertEqual(result[:5], (b'\x00', 0x01, 0x01, '10.19.1.23', 443))
+        self.assertEqual(result[5], payload)
+
+    def test_payload_split_across_reads(self):
+        rng = random.Random(8305)
+        payload = bytes(rng.getrandbits(8) for _ in range(3000))
+        for hello, req in CASES:
+            expected = drive([hello + req])[:5]
+            for _ in range(50):
+                result = drive(split(hello + req + payload, rng))
+                self.assertEqual(result[:5], expected)
+                self.assertEqual(result[5], payload)
+
+    def test_greeting_alone_leaves_request_unparsed(self):
+        parser = SOCKS5Parser()
+        parser.feed(greeting() + request(0x03, 'example.com', 443)[:6])
+        self.assertTrue(parser.parse_greeting())
+        self.assertFalse(parser.parse_request())
+        self.assertEqual(parser.buffered, 6)
+
+    def test_oversized_handshake_is_refused(self):
+        parser = SOCKS5Parser()
+        parser.feed(greeting())
+        self.assertTrue(parser.parse_greeting())
+        with self.assertRaises(SOCKS5Error):
+            parser.feed(b'\x00' * (SOCKS5Parser.BUFFER_SIZE + 1))
+
+
+class MalformedInputTests(unittest.TestCase):
+
+    def assertReply(self, data: bytes, reply):
+        parser = SOCKS5Parser()
+        parser.feed(data)
+        with self.assertRaises(SOCKS5Error) as raised:
+            parser.parse_greeting() and parser.parse_request()
+        self.assertEqual(raised.exception.reply, reply)
+
+    def test_rejections(self):
+        self.assertReply(b'\x04\x01\x00', None)                      # SOCKS4 greeting
+        self.assertReply(b'\x05\x00', None)                          # No methods
+        self.assertReply(greeting() + b'\x04\x01\x00\x01\x00', 0x01)  # Bad request version
+        self.assertReply(greeting() + b'\x05\x01\x00\x05\x00', 0x08)  # Unknown ATYP
+        self.assertReply(greeting() + b'\x05\x01\x00\x03\x00', 0x01)  # Empty domain
+        self.assertReply(greeting() + b'\x05\x01\x00\x03\x02\xff\xfe\x00\x50', 0x01)
+
+
+class FuzzTests(unittest.TestCase):
+    """Random input may only ever raise SOCKS5Error, and never over-reads."""
+
+    def fuzz(self, data: bytes, rng: random.Random) -> None:
+        parser = SOCKS5Parser()
+        fed = 0
+        stage = 0
+        parses = 0
+        try:
+            for chunk in split(data, rng):
+                parser.feed(chunk)
+                fed += len(chunk)
+                while stage < 2:
+                    parses += 1
+                    self.assertLess(parses, 2 * len(data) + 10, "parser did not make progress")
+                    before = parser.start
+                    done = (parser.parse_greeting, parser.parse_request)[stage]()
+                    self.assertTrue(0 <= parser.start <= parser.end)
+                    self.assertLessEqual(parser.buffered, fed)
+                    if not done:
+                        self.assertEqual(parser.start, before)  # Nothing consumed
+                        break
+                    self.assertGreater(parser.start, before)
+                    stage += 1
+        except SOCKS5Error:
+            return
+        if stage == 2:
+            consumed = fed - parser.buffered
+            self.assertEqual(parser.take_pending(), data[consumed:fed])
+
+    def test_random_bytes(self):
+        rng = random.Random(20250717)
+        for _ in range(3000):
+            data = bytes(rng.getrandbits(8) for _ in range(rng.randint(0, 300)))
+            self.fuzz(data, rng)
+
+    def test_mutated_handshakes(self):
+        rng = random.Random(3)
+        for _ in range(3000):
+            hello, req = rng.choice(CASES)
+            data = bytearray(hello + req + b'payload')
+            for _ in range(rng.randint(1, 4)):
+                data[rng.randrange(len(data))] = rng.getrandbits(8)
+            self.fuzz(bytes(data), rng)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+End-to-end tests: UDP ASSOCIATE datagrams follow the routing rules.
+
+Each test starts the proxy as a subprocess on a free loopback port, so
+both engines run exactly as from the command line.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+
+import os
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+PROXY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                     'socks5_proxy.py')
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def udp_header(atyp: int, address: str, port: int) -> bytes:
+    if atyp == 0x01:
+        encoded = socket.inet_aton(address)
+    else:
+        encoded = bytes([len(address)]) + address.encode()
+    return b'\x00\x00\x00' + bytes([atyp]) + encoded + struct.pack('>H', port)
+
+
+class ProxyTestCase(unittest.TestCase):
+    """Starts a proxy with the class's rules and opens a UDP association."""
+
+    engine = 'threaded'
+    rules = ''
+
+    def setUp(self):
+        # Echo server on every loopback address, recording what reaches it
+        self.received = []
+        self.echo = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.echo.bind(('0.0.0.0', 0))
+        self.echo_port = self.echo.getsockname()[1]
+        threading.Thread(target=self._echo, daemon=True).start()
+
+        directory = tempfile.mkdtemp()
+        rules = os.path.join(directory, 'rules.txt')
+        with open(rules, 'w') as f:
+            f.write(self.rules)
+        self.port = free_port()
+        # The VPN DNS server is unreachable: only 'system' names can resolve quickly
+        self.proxy = subprocess.Popen(
+            [sys.executable, PROXY, '--host', '127.0.0.1', '--port', str(self.port),
+             '--dns', '192.0.2.1', '--engine', self.engine, '--rules', rules,
+             '--no-network-cache', '--no-dns-snapshot', '--drain-timeout', '0'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.addCleanup(self._stop)
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                self.control = socket.create_connection(('127.0.0.1', self.port), timeout=5)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+        self.addCleanup(self.control.close)
+
+        self.client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.client.bind(('127.0.0.1', 0))
+        self.client.settimeout(1.0)
+        self.addCleanup(self.client.close)
+        self.control.sendall(b'\x05\x01\x00' + b'\x05\x03\x00\x01' + socket.inet_aton('0.0.0.0') +
+                             struct.pack('>H', self.client.getsockname()[1]))
+        reply = b''
+        while len(reply) < 12:
+            reply += self.control.recv(12 - len(reply))
+        self.assertEqual(reply[:4], b'\x05\x00\x05\x00')
+        self.relay = (socket.inet_ntoa(reply[6:10]), struct.unpack('>H', reply[10:12])[0])
+
+    def _echo(self):
+        while True:
+            try:
+                data, source = self.echo.recvfrom(65535)
+            except OSError:
+                return
+            self.received.append(data)
+            self.echo.sendto(b'echo:' + data, source)
+
+    def _stop(self):
+        self.proxy.terminate()
+        self.proxy.wait(10)
+        self.echo.close()
+
+    def exchange(self, header: bytes, payload: bytes):
+        """Send one datagram through the relay; return the echoed payload or None."""
+        self.client.sendto(header + payload, self.relay)
+        try:
+            data, _ = self.client.recvfrom(65535)
+        except socket.timeout:
+            return None
+        return data[len(udp_header(0x01, '127.0.0.1', 0)):]
+
+    def assertDropped(self, header: bytes):
+        self.assertIsNone(self.exchange(header, b'dropped'))
+        self.assertNotIn(b'dropped', self.received)
+
+
+class UDPRoutingTests(ProxyTestCase):
+    rules = """\
+127.0.0.2/32        reject
+localhost           system
+"""
+
+    def test_allowed_address_is_relayed(self):
+        self.assertEqual(self.exchange(udp_header(0x01, '127.0.0.1', self.echo_port), b'ok'),
+                         b'echo:ok')
+
+    def test_rejected_address_is_dropped(self):
+        # Linux routes all of 127/8 to loopback, so without the rule this would arrive
+        self.assertDropped(udp_header(0x01, '127.0.0.2', self.echo_port))
+        self.assertEqual(self.exchange(udp_header(0x01, '127.0.0.1', self.echo_port), b'ok'),
+                         b'echo:ok')
+
+    def test_system_domain_skips_vpn_dns(self):
+        # A VPN DNS lookup would first time out against the unreachable server
+        self.client.settimeout(2.0)
+        started = time.monotonic()
+        self.assertEqual(self.exchange(udp_header(0x03, 'localhost', self.echo_port), b'ok'),
+                         b'echo:ok')
+        self.assertLess(time.monotonic() - started, 1.0)
+
+
+class UDPDomainRejectTests(ProxyTestCase):
+    rules = """\
+localhost           reject
+"""
+
+    def test_rejected_domain_is_dropped(self):
+        self.assertDropped(udp_header(0x03, 'localhost', self.echo_port))
+        self.assertEqual(self.exchange(udp_header(0x01, '127.0.0.1', self.echo_port), b'ok'),
+                         b'echo:ok')
+
+
+class AsyncioUDPRoutingTests(UDPRoutingTests):
+    engine = 'asyncio'
+
+
+class AsyncioUDPDomainRejectTests(UDPDomainRejectTests):
+    engine = 'asyncio'
+
+
+if __name__ == '__main__':
+    unittest.main()